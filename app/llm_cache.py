@@ -0,0 +1,118 @@
+import hashlib
+import os
+import time
+from types import SimpleNamespace
+
+# Cache files live outside the project so test runs in temp dirs share them.
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cc-claude")
+
+
+def make_key(body: bytes) -> str:
+    """Stable hash of the encoded request (model, messages and tools)."""
+    return hashlib.sha256(body).hexdigest()
+
+
+def serialize_message(message) -> dict:
+    """Turn an SDK assistant message into a JSON-friendly dict."""
+    tool_calls = getattr(message, "tool_calls", None) or []
+    return {
+        "content": message.content,
+        "tool_calls": [
+            {
+                "id": tc.id,
+                "type": tc.type,
+                "function": {"name": tc.function.name, "arguments": tc.function.arguments},
+            }
+            for tc in tool_calls
+        ],
+    }
+
+
+def message_from_dict(data: dict) -> SimpleNamespace:
+    """Rebuild an object that quacks like `resp.choices[0].message`."""
+    tool_calls = [
+        SimpleNamespace(
+            id=tc["id"],
+            type=tc["type"],
+            function=SimpleNamespace(
+                name=tc["function"]["name"],
+                arguments=tc["function"]["arguments"],
+            ),
+        )
+        for tc in data.get("tool_calls") or []
+    ]
+    return SimpleNamespace(content=data.get("content"), tool_calls=tool_calls)
+
+
+class LLMCache:
+    """
+    Exact-match cache of assistant messages.
+    - Entries are kept in an in-memory dict for lookups.
+    - Every `set` is appended to a JSON-lines file so later runs can reuse it.
+    - On load, expired and superseded lines are dropped and the file is rewritten.
+    - `json` is imported on first use so a disabled cache costs nothing at startup.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or os.path.join(CACHE_DIR, "completions.jsonl")
+        self._entries: dict[str, tuple[float, dict]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        import json
+
+        try:
+            f = open(self.path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+
+        now = time.time()
+        lines = 0
+        with f:
+            for line in f:
+                lines += 1
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A partially written line (e.g. interrupted run) is just ignored.
+                    continue
+                if record["expires"] > now:
+                    self._entries[record["key"]] = (record["expires"], record["value"])
+
+        # Expired, duplicate or broken lines: rewrite the file with only the live entries
+        # so it (and the parse cost above) doesn't keep growing.
+        if lines > len(self._entries):
+            self._compact()
+
+    def _compact(self) -> None:
+        import json
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, (expires, value) in self._entries.items():
+                f.write(json.dumps({"key": key, "expires": expires, "value": value}) + "\n")
+        # Atomic swap, so a concurrent or interrupted run never sees a half-written cache.
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires, value = entry
+        if expires <= time.time():
+            del self._entries[key]
+            return None
+        return value
+
+    def set(self, key: str, value: dict, expire: float = 3600) -> None:
+        import json
+
+        expires = time.time() + expire
+        self._entries[key] = (expires, value)
+
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "expires": expires, "value": value}) + "\n")
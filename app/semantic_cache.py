@@ -0,0 +1,82 @@
+import json
+import os
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from app.llm_cache import CACHE_DIR
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+SIMILARITY_THRESHOLD = 0.92
+
+
+class SemanticCache:
+    """
+    Cache of final answers keyed by the meaning of the user prompt.
+    - Prompts are embedded locally (normalized, so a dot product is cosine similarity).
+    - Prompt and answer embeddings are stored as N x D matrices (`.npy`),
+      answers as a parallel JSON list.
+    - A lookup is a single matrix-vector product against every past prompt.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._prompts_path = os.path.join(directory, "semantic_prompts.npy")
+        self._responses_path = os.path.join(directory, "semantic_responses.npy")
+        self._answers_path = os.path.join(directory, "semantic_answers.json")
+        self._model = SentenceTransformer(EMBEDDING_MODEL)
+
+        dim = self._model.get_sentence_embedding_dimension()
+        try:
+            self._prompts = np.load(self._prompts_path)
+            self._responses = np.load(self._responses_path)
+            with open(self._answers_path, "r", encoding="utf-8") as f:
+                self._answers = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._reset(dim)
+            return
+
+        # An interrupted save can leave the three files out of step; start over
+        # rather than index past the end of `_answers` on every lookup.
+        if not len(self._prompts) == len(self._responses) == len(self._answers):
+            self._reset(dim)
+
+    def _reset(self, dim: int) -> None:
+        self._prompts = np.empty((0, dim), dtype=np.float32)
+        self._responses = np.empty((0, dim), dtype=np.float32)
+        self._answers = []
+
+    def embed(self, text: str) -> np.ndarray:
+        return self._model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+    def lookup(self, prompt_embedding: np.ndarray) -> str | None:
+        """Return the answer of the most similar past prompt, if similar enough."""
+        if not self._answers:
+            return None
+
+        sims = self._prompts @ prompt_embedding
+        best = int(np.argmax(sims))
+        if sims[best] > self.threshold:
+            return self._answers[best]
+        return None
+
+    def add(self, prompt_embedding: np.ndarray, answer: str) -> None:
+        self._prompts = np.vstack([self._prompts, prompt_embedding])
+        self._responses = np.vstack([self._responses, self.embed(answer)])
+        self._answers.append(answer)
+
+        self._save()
+
+    def _save(self) -> None:
+        """Write all three files to temp paths first, then swap each in with os.replace."""
+        os.makedirs(os.path.dirname(self._prompts_path), exist_ok=True)
+
+        with open(self._prompts_path + ".tmp", "wb") as f:
+            np.save(f, self._prompts)
+        with open(self._responses_path + ".tmp", "wb") as f:
+            np.save(f, self._responses)
+        with open(self._answers_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self._answers, f)
+
+        for path in (self._prompts_path, self._responses_path, self._answers_path):
+            os.replace(path + ".tmp", path)
@@ -0,0 +1,45 @@
+import json
+
+from app.llm_cache import LLMCache, make_key, message_from_dict, serialize_message
+
+
+def test_set_then_get_survives_reload(tmp_path):
+    path = str(tmp_path / "completions.jsonl")
+    key = make_key(b'{"model":"m"}')
+    LLMCache(path).set(key, {"content": "hi", "tool_calls": []})
+
+    assert LLMCache(path).get(key) == {"content": "hi", "tool_calls": []}
+
+
+def test_expired_entries_are_missed(tmp_path):
+    path = str(tmp_path / "completions.jsonl")
+    LLMCache(path).set("k", {"content": "old", "tool_calls": []}, expire=-1)
+
+    assert LLMCache(path).get("k") is None
+
+
+def test_load_compacts_expired_and_duplicate_lines(tmp_path):
+    path = tmp_path / "completions.jsonl"
+    cache = LLMCache(str(path))
+    cache.set("gone", {"content": "x", "tool_calls": []}, expire=-1)
+    cache.set("k", {"content": "v1", "tool_calls": []})
+    cache.set("k", {"content": "v2", "tool_calls": []})
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "broken"')
+
+    reloaded = LLMCache(str(path))
+
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [r["key"] for r in records] == ["k"]
+    assert reloaded.get("k") == {"content": "v2", "tool_calls": []}
+
+
+def test_message_round_trip():
+    data = {
+        "content": None,
+        "tool_calls": [
+            {"id": "c1", "type": "function", "function": {"name": "Read", "arguments": '{"file_path": "a"}'}},
+        ],
+    }
+
+    assert serialize_message(message_from_dict(data)) == data
@@ -0,0 +1,138 @@
+import asyncio
+import subprocess
+import threading
+import time
+
+import pytest
+
+from app import main
+
+
+def test_truncate_output_keeps_short_text():
+    text = "x" * main.BASH_MAX_OUTPUT_CHARS
+    assert main.truncate_output(text) == text
+
+
+def test_truncate_output_keeps_head_and_tail(monkeypatch):
+    monkeypatch.setattr(main, "BASH_MAX_OUTPUT_CHARS", 400)
+    text = "H" * 100 + "m" * 1000 + "T" * 200
+
+    out = main.truncate_output(text)
+
+    assert out.startswith("H" * 100 + "\n...[truncated 1000 chars of output]...\n")
+    assert out.endswith("T" * 200)
+    assert len(out) < len(text)
+
+
+@pytest.mark.parametrize("value", ["1", "0", "-5"])
+def test_env_int_clamps_to_minimum(monkeypatch, value):
+    monkeypatch.setenv("CC_TEST_INT", value)
+    assert main.env_int("CC_TEST_INT", default=16000, minimum=400) == 400
+
+
+@pytest.mark.parametrize("value", ["abc", "", "1.5"])
+def test_env_int_falls_back_on_invalid_value(monkeypatch, value):
+    monkeypatch.setenv("CC_TEST_INT", value)
+    assert main.env_int("CC_TEST_INT", default=16000, minimum=400) == 16000
+
+
+@pytest.mark.parametrize(
+    "prompt",
+    ["show me main.py", "read app/main.py", "cat the contents of notes.txt", "Print README.md"],
+)
+def test_raw_read_prompt_matches_single_file_requests(prompt):
+    assert main.RAW_READ_PROMPT.match(prompt)
+
+
+@pytest.mark.parametrize(
+    "prompt",
+    ["Read README.md and follow the instructions", "show me how main.py works", "delete old.txt"],
+)
+def test_raw_read_prompt_ignores_other_requests(prompt):
+    assert not main.RAW_READ_PROMPT.match(prompt)
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        'echo "a\\nb"',
+        "printf 'x\\ty'",
+        "pwd",
+        "test -d sub",
+        "[ -f nope ]",
+        "ls sub/f.txt",
+        "./noshebang.sh",
+    ],
+)
+def test_tool_bash_matches_shell_output(tmp_path, monkeypatch, command):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "f.txt").write_text("x")
+    script = tmp_path / "noshebang.sh"
+    script.write_text("echo from-script\n")
+    script.chmod(0o755)
+
+    completed = subprocess.run(command, shell=True, capture_output=True, text=True)
+    expected = completed.stdout
+    if completed.returncode != 0:
+        expected = f"ERROR (code {completed.returncode})\nSTDOUT:\n{completed.stdout}\nSTDERR:\n{completed.stderr}"
+
+    assert asyncio.run(main.tool_bash(command)) == expected
+
+
+def test_run_tools_keeps_side_effects_in_request_order(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = [
+        ("Bash", '{"command": "mkdir d && echo first > d/f"}'),
+        ("Read", '{"file_path": "d/f"}'),
+        ("Write", '{"file_path": "d/f", "content": "second"}'),
+        ("Read", '{"file_path": "d/f"}'),
+        ("Read", '{"file_path": "d/f"}'),
+    ]
+
+    outputs = asyncio.run(main.run_tools(calls))
+
+    assert outputs == ["", "first\n", "Wrote 6 bytes to d/f", "second", "second"]
+
+
+def run_in_thread(coro_fn, timeout=10):
+    """Run `asyncio.run(coro_fn())` in a thread so a hang fails the test instead of blocking it."""
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = asyncio.run(coro_fn())
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "event loop did not shut down"
+    return outcome
+
+
+@pytest.mark.parametrize(
+    "calls",
+    [
+        [("Bash", '{"command": "echo hi"}'), ("Read", '{"file_path": "missing.txt"}')],
+        [("Read", '{"file_path": "big.txt"}'), ("Read", '{"file_path": "missing.txt"}')],
+    ],
+)
+def test_run_tools_failed_read_exits_cleanly(tmp_path, monkeypatch, calls):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "big.txt").write_text("x" * (main.READ_INLINE_MAX_BYTES * 4))
+
+    outcome = run_in_thread(lambda: main.run_tools(calls))
+
+    assert isinstance(outcome.get("error"), FileNotFoundError)
+
+
+def test_tool_bash_timeout_kills_whole_pipeline(monkeypatch):
+    monkeypatch.setattr(main, "BASH_TIMEOUT_SECONDS", 0.5)
+
+    start = time.monotonic()
+    output = asyncio.run(main.tool_bash("sleep 5 | cat"))
+
+    assert output == "ERROR: command timed out after 0.5s"
+    assert time.monotonic() - start < 3
@@ -0,0 +1,64 @@
+import json
+import sys
+import types
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+class FakeSentenceTransformer:
+    """Deterministic 4-dim 'embeddings': one axis per known word, everything else on the last."""
+
+    WORDS = ["read", "show", "delete"]
+
+    def __init__(self, name):
+        self.name = name
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+    def encode(self, text, normalize_embeddings=False):
+        vec = np.zeros(4, dtype=np.float32)
+        for i, word in enumerate(self.WORDS):
+            if word in text.lower():
+                vec[i] = 1.0
+        if not vec.any():
+            vec[3] = 1.0
+        return vec / np.linalg.norm(vec)
+
+
+@pytest.fixture
+def semantic_cache(monkeypatch):
+    monkeypatch.setitem(
+        sys.modules,
+        "sentence_transformers",
+        types.SimpleNamespace(SentenceTransformer=FakeSentenceTransformer),
+    )
+    monkeypatch.delitem(sys.modules, "app.semantic_cache", raising=False)
+    from app import semantic_cache
+
+    return semantic_cache
+
+
+def test_lookup_returns_answer_of_similar_prompt_after_reload(tmp_path, semantic_cache):
+    cache = semantic_cache.SemanticCache(str(tmp_path))
+    cache.add(cache.embed("read main.py"), "contents")
+
+    reloaded = semantic_cache.SemanticCache(str(tmp_path))
+
+    assert reloaded.lookup(reloaded.embed("please READ main.py")) == "contents"
+    assert reloaded.lookup(reloaded.embed("delete main.py")) is None
+
+
+def test_mismatched_files_are_discarded(tmp_path, semantic_cache):
+    cache = semantic_cache.SemanticCache(str(tmp_path))
+    cache.add(cache.embed("read a"), "a")
+    cache.add(cache.embed("show b"), "b")
+    # Simulate a save interrupted after the .npy files: answers list is one short.
+    (tmp_path / "semantic_answers.json").write_text(json.dumps(["a"]), encoding="utf-8")
+
+    reloaded = semantic_cache.SemanticCache(str(tmp_path))
+
+    assert reloaded.lookup(reloaded.embed("show b")) is None
+    assert not list(tmp_path.glob("*.tmp"))